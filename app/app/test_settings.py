@@ -0,0 +1,55 @@
+"""
+Django settings used when running the test suite.
+
+Extends the project settings with overrides that make tests faster.
+"""
+
+from app.settings import *  # noqa: F401,F403
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/2.2/topics/testing/overview/#password-hashing
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/topics/testing/overview/#the-test-database
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+        'CONN_MAX_AGE': None,
+    }
+}
+
+
+# N+1 query detection
+# https://github.com/jmcarp/nplusone
+
+INSTALLED_APPS = INSTALLED_APPS + [  # noqa: F405
+    'nplusone.ext.django',
+]
+
+MIDDLEWARE = [
+    'nplusone.ext.django.NPlusOneMiddleware',
+] + MIDDLEWARE  # noqa: F405
+
+NPLUSONE_RAISE = True
+
+
+# Migrations
+# https://docs.djangoproject.com/en/2.2/ref/settings/#migration-modules
+
+# Test databases are built with syncdb; CI checks and applies migrations.
+MIGRATION_MODULES = {
+    'admin': None,
+    'auth': None,
+    'contenttypes': None,
+    'sessions': None,
+    'authtoken': None,
+    'core': None,
+}
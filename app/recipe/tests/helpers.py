@@ -0,0 +1,10 @@
+from django.contrib.auth import get_user_model
+
+
+def sample_user_without_password(email='test@test.com'):
+    """Create and return a sample user without a usable password"""
+    user = get_user_model()(email=email)
+    user.set_unusable_password()
+    user.save()
+
+    return user
@@ -1,4 +1,3 @@
-from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
 
@@ -8,6 +7,7 @@ from rest_framework.test import APIClient
 from core.models import Ingredient, Recipe
 
 from recipe.serializers import IngredientSerializer
+from recipe.tests.helpers import sample_user_without_password
 
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
@@ -30,12 +30,14 @@ class PublicIngredientsApiTests(TestCase):
 class PrivateIngredientsApiTest(TestCase):
     """Test the authorised user ingredients API"""
 
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = sample_user_without_password()
+        cls.user2 = sample_user_without_password('other@test.com')
+
     def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            'test@test.com',
-            'testpass'
-        )
-        self.client = APIClient()
         self.client.force_authenticate(self.user)
 
     def test_retrieve_ingredients(self):
@@ -53,11 +55,7 @@ class PrivateIngredientsApiTest(TestCase):
 
     def test_ingredients_limited_to_user(self):
         """Test that ingredients returned are for the authenticated user"""
-        user2 = get_user_model().objects.create_user(
-            'other@test.com',
-            'otherpass'
-        )
-        Ingredient.objects.create(user=user2, name='Apple')
+        Ingredient.objects.create(user=self.user2, name='Apple')
         ingredient = Ingredient.objects.create(user=self.user, name='Pear')
 
         response = self.client.get(INGREDIENTS_URL)
@@ -113,14 +111,13 @@ class PrivateIngredientsApiTest(TestCase):
             price=8.00,
             user=self.user
         )
-        recipe1.ingredients.add(ingredient)
         recipe2 = Recipe.objects.create(
             title='Plums in Vinegar',
             time_minutes=5,
             price=5.00,
             user=self.user
         )
-        recipe2.ingredients.add(ingredient)
+        ingredient.recipe_set.add(recipe1, recipe2)
 
         response = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
@@ -1,33 +1,64 @@
-import tempfile
 import os
 
-from PIL import Image
+from functools import lru_cache
 
-from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from django.test import TestCase
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+    force_authenticate
+)
 
 from core.models import Recipe, Tag, Ingredient
 
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.views import RecipeViewSet
+from recipe.tests.helpers import sample_user_without_password
 
 
 RECIPIES_URL = reverse('recipe:recipe-list')
 
 
+@lru_cache(maxsize=None)
 def image_upload_url(recipe_id):
     """Return recipe image upload URL"""
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
 
+@lru_cache(maxsize=None)
 def recipe_detail_url(recipe_id):
     """Return recipe detail URL"""
     return reverse('recipe:recipe-detail', args=[recipe_id])
 
 
+def list_recipies(user):
+    """Call the recipe list view directly, bypassing the middleware"""
+    request = APIRequestFactory().get(RECIPIES_URL)
+    force_authenticate(request, user=user)
+
+    return RecipeViewSet.as_view({'get': 'list'})(request)
+
+
+def retrieve_recipe(user, recipe_id):
+    """Call the recipe detail view directly, bypassing the middleware"""
+    request = APIRequestFactory().get(recipe_detail_url(recipe_id))
+    force_authenticate(request, user=user)
+
+    return RecipeViewSet.as_view({'get': 'retrieve'})(request, pk=recipe_id)
+
+
+# A 1x1 pixel PNG image
+SAMPLE_PNG = (
+    b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01'
+    b'\x08\x02\x00\x00\x00\x90wS\xde\x00\x00\x00\x0cIDATx\xdac```\x00\x00'
+    b'\x00\x04\x00\x01\xc8\xea\xeb\xf9\x00\x00\x00\x00IEND\xaeB`\x82'
+)
+
+
 def sample_tag(user, name='Main course'):
     """Create and return a sample tag"""
     return Tag.objects.create(user=user, name=name)
@@ -67,56 +98,57 @@ class PublicRecipiesApiTests(TestCase):
 class PrivateRecipiesApiTest(TestCase):
     """Test the authorised user ingredients API"""
 
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = sample_user_without_password()
+        cls.user2 = sample_user_without_password('other@test.com')
+        cls.recipe = sample_recipe(user=cls.user)
+        cls.recipe.tags.add(sample_tag(user=cls.user))
+        cls.recipe.ingredients.add(sample_ingredient(user=cls.user))
+        cls.recipe2 = sample_recipe(user=cls.user, title='Second Recipe')
+        cls.other_recipe = sample_recipe(user=cls.user2)
+
     def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            'test@test.com',
-            'testpass'
-        )
-        self.client = APIClient()
         self.client.force_authenticate(self.user)
 
     def test_retrieve_recipies(self):
         """Test retrieving recipies"""
+        # Recipies, their tags and their ingredients, whatever the count
+        with self.assertNumQueries(3):
+            response = list_recipies(self.user)
 
-        sample_recipe(user=self.user)
-        sample_recipe(user=self.user)
-
-        response = self.client.get(RECIPIES_URL)
-
-        recipies = Recipe.objects.all().order_by('-id')
+        recipies = Recipe.objects.filter(user=self.user).order_by('-id')
         serializer = RecipeSerializer(recipies, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data],
+            [self.recipe2.id, self.recipe.id]
+        )
 
     def test_recipies_limited_to_user(self):
         """Test that recipies returned are for the authenticated user"""
-        user2 = get_user_model().objects.create_user(
-            'other@test.com',
-            'otherpass'
-        )
-        sample_recipe(user=user2)
-        sample_recipe(user=self.user)
-
-        response = self.client.get(RECIPIES_URL)
+        response = list_recipies(self.user)
 
-        recipies = Recipe.objects.filter(user=self.user)
+        recipies = Recipe.objects.filter(user=self.user).order_by('-id')
         serializer = RecipeSerializer(recipies, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data), 2)
         self.assertEqual(response.data, serializer.data)
+        self.assertNotIn(
+            self.other_recipe.id,
+            [recipe['id'] for recipe in response.data]
+        )
 
     def test_recipe_detail_view(self):
         """Test viewing a recipe detail"""
-        recipe = sample_recipe(user=self.user)
-        recipe.tags.add(sample_tag(user=self.user))
-        recipe.ingredients.add(sample_ingredient(user=self.user))
-
-        url = recipe_detail_url(recipe.id)
-        response = self.client.get(url)
+        response = retrieve_recipe(self.user, self.recipe.id)
 
-        serializer = RecipeDetailSerializer(recipe)
+        serializer = RecipeDetailSerializer(self.recipe)
         self.assertEqual(response.data, serializer.data)
 
     def test_create_recipe_invalid(self):
@@ -140,43 +172,33 @@ class PrivateRecipiesApiTest(TestCase):
         for key in payload.keys():
             self.assertEqual(payload[key], getattr(recipe, key))
 
-    def test_create_recipe_with_tags(self):
-        """Creating a recipe with tags"""
-        tag1 = sample_tag(user=self.user, name='Vegetarian')
-        tag2 = sample_tag(user=self.user, name='Breakfast')
-        payload = {
-            'title': 'Zuccini Scrambled Eggs',
-            'time_minutes': 10,
-            'price': 3.00,
-            'tags': [tag1.id, tag2.id]
-        }
-        response = self.client.post(RECIPIES_URL, payload)
-
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        recipe = Recipe.objects.get(id=response.data['id'])
-        tags = recipe.tags.all()
-        self.assertAlmostEqual(tags.count(), 2)
-        self.assertIn(tag1, tags)
-        self.assertIn(tag2, tags)
-
-    def test_create_recipe_with_ingredients(self):
-        """Creating a recipe with ingredients"""
-        ingredient1 = sample_ingredient(user=self.user, name='Eggs')
-        ingredient2 = sample_ingredient(user=self.user, name='Zuccini')
-        payload = {
-            'title': 'Zuccini Scrambled Eggs',
-            'time_minutes': 10,
-            'price': 3.00,
-            'ingredients': [ingredient1.id, ingredient2.id]
-        }
-        response = self.client.post(RECIPIES_URL, payload)
-
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        recipe = Recipe.objects.get(id=response.data['id'])
-        ingredients = recipe.ingredients.all()
-        self.assertAlmostEqual(ingredients.count(), 2)
-        self.assertIn(ingredient1, ingredients)
-        self.assertIn(ingredient2, ingredients)
+    def test_create_recipe_with_relations(self):
+        """Creating a recipe with tags or ingredients"""
+        relations = (
+            ('tags', sample_tag, ('Vegetarian', 'Breakfast')),
+            ('ingredients', sample_ingredient, ('Eggs', 'Zuccini')),
+        )
+        for field, sample, names in relations:
+            with self.subTest(field=field):
+                related1 = sample(user=self.user, name=names[0])
+                related2 = sample(user=self.user, name=names[1])
+                payload = {
+                    'title': 'Zuccini Scrambled Eggs',
+                    'time_minutes': 10,
+                    'price': 3.00,
+                    field: [related1.id, related2.id]
+                }
+                response = self.client.post(RECIPIES_URL, payload)
+
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_201_CREATED
+                )
+                recipe = Recipe.objects.get(id=response.data['id'])
+                related = list(getattr(recipe, field).all())
+                self.assertEqual(len(related), 2)
+                self.assertIn(related1, related)
+                self.assertIn(related2, related)
 
     def test_partial_update_recipe(self):
         """Test updating a recipe with patch"""
@@ -217,12 +239,13 @@ class PrivateRecipiesApiTest(TestCase):
 
 class RecipeImageUploadTests(TestCase):
 
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = sample_user_without_password()
+
     def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            'test@test.com',
-            'testpass'
-        )
-        self.client = APIClient()
         self.client.force_authenticate(self.user)
         self.recipe = sample_recipe(user=self.user)
 
@@ -232,13 +255,12 @@ class RecipeImageUploadTests(TestCase):
     def test_upload_image_to_recipe(self):
         """Test uploading an image to recipe"""
         url = image_upload_url(self.recipe.id)
-        with tempfile.NamedTemporaryFile(suffix='.jpg') as named_file:
-            img = Image.new('RGB', (10, 10))
-            img.save(named_file, format='JPEG')
-            named_file.seek(0)
-            response = self.client.post(
-                url, {'image': named_file}, format='multipart'
-            )
+        image_file = SimpleUploadedFile(
+            'image.png', SAMPLE_PNG, content_type='image/png'
+        )
+        response = self.client.post(
+            url, {'image': image_file}, format='multipart'
+        )
 
         self.recipe.refresh_from_db()
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -254,46 +276,84 @@ class RecipeImageUploadTests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+
+class RecipeFilterApiTests(TestCase):
+    """Test filtering recipies by tags and ingredients"""
+
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = sample_user_without_password()
+        cls.tag1 = sample_tag(user=cls.user, name='Meat')
+        cls.tag2 = sample_tag(user=cls.user, name='Vegetarian')
+        cls.ingredient1 = sample_ingredient(user=cls.user, name='Milk')
+        cls.ingredient2 = sample_ingredient(
+            user=cls.user,
+            name='Cottage Cheese'
+        )
+        cls.tagged1 = sample_recipe(user=cls.user, title='Boiled Sausages')
+        cls.tagged2 = sample_recipe(user=cls.user, title='Zuccini Pasta')
+        cls.with_ingredient1 = sample_recipe(user=cls.user, title='Pancakes')
+        cls.with_ingredient2 = sample_recipe(
+            user=cls.user,
+            title='Cheese Cake'
+        )
+        cls.plain = sample_recipe(user=cls.user, title='Chocolate Cake')
+
+        RecipeTag = Recipe.tags.through
+        RecipeTag.objects.bulk_create([
+            RecipeTag(recipe=cls.tagged1, tag=cls.tag1),
+            RecipeTag(recipe=cls.tagged2, tag=cls.tag2),
+        ])
+        RecipeIngredient = Recipe.ingredients.through
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(
+                recipe=cls.with_ingredient1,
+                ingredient=cls.ingredient1
+            ),
+            RecipeIngredient(
+                recipe=cls.with_ingredient2,
+                ingredient=cls.ingredient2
+            ),
+        ])
+
+        recipies = (
+            cls.tagged1,
+            cls.tagged2,
+            cls.with_ingredient1,
+            cls.with_ingredient2,
+            cls.plain
+        )
+        cls.serialized = {
+            recipe.id: RecipeSerializer(recipe).data for recipe in recipies
+        }
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
     def test_filter_recipes_by_tags(self):
         """Test returning recipies with specific tags"""
-        recipe1 = sample_recipe(user=self.user, title='Boiled Sausages')
-        recipe2 = sample_recipe(user=self.user, title='Zuccini Pasta')
-        tag1 = sample_tag(user=self.user, name='Meat')
-        tag2 = sample_tag(user=self.user, name='Vegetarian')
-        recipe1.tags.add(tag1)
-        recipe2.tags.add(tag2)
-        recipe3 = sample_recipe(user=self.user, title='Chocolate Cake')
-
-        response = self.client.get(
-            RECIPIES_URL,
-            {'tags': f'{tag1.id}, {tag2.id}'}
-        )
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                RECIPIES_URL,
+                {'tags': f'{self.tag1.id}, {self.tag2.id}'}
+            )
 
-        serializer1 = RecipeSerializer(recipe1)
-        serializer2 = RecipeSerializer(recipe2)
-        serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, response.data)
-        self.assertIn(serializer2.data, response.data)
-        self.assertNotIn(serializer3.data, response.data)
+        self.assertIn(self.serialized[self.tagged1.id], response.data)
+        self.assertIn(self.serialized[self.tagged2.id], response.data)
+        self.assertNotIn(self.serialized[self.plain.id], response.data)
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipies with specific ingredients"""
-        recipe1 = sample_recipe(user=self.user, title='Pancakes')
-        recipe2 = sample_recipe(user=self.user, title='Cheese Cake')
-        ingredient1 = sample_ingredient(user=self.user, name='Milk')
-        ingredient2 = sample_ingredient(user=self.user, name='Cottage Cheese')
-        recipe1.ingredients.add(ingredient1)
-        recipe2.ingredients.add(ingredient2)
-        recipe3 = sample_recipe(user=self.user, title='Banana Shake')
-
-        response = self.client.get(
-            RECIPIES_URL,
-            {'ingredients': f'{ingredient1.id}, {ingredient2.id}'}
-        )
+        ingredient_ids = f'{self.ingredient1.id}, {self.ingredient2.id}'
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                RECIPIES_URL,
+                {'ingredients': ingredient_ids}
+            )
 
-        serializer1 = RecipeSerializer(recipe1)
-        serializer2 = RecipeSerializer(recipe2)
-        serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, response.data)
-        self.assertIn(serializer2.data, response.data)
-        self.assertNotIn(serializer3.data, response.data)
+        serialized = self.serialized
+        self.assertIn(serialized[self.with_ingredient1.id], response.data)
+        self.assertIn(serialized[self.with_ingredient2.id], response.data)
+        self.assertNotIn(serialized[self.plain.id], response.data)
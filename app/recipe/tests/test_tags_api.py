@@ -1,4 +1,3 @@
-from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
 
@@ -8,6 +7,7 @@ from rest_framework.test import APIClient
 from core.models import Tag, Recipe
 
 from recipe.serializers import TagSerializer
+from recipe.tests.helpers import sample_user_without_password
 
 
 TAGS_URL = reverse('recipe:tag-list')
@@ -30,12 +30,14 @@ class PublicTagsApiTests(TestCase):
 class PrivateTagsApiTest(TestCase):
     """Test the authorised user tags API"""
 
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = sample_user_without_password()
+        cls.user2 = sample_user_without_password('other@test.com')
+
     def setUp(self):
-        self.user = get_user_model().objects.create_user(
-            'test@test.com',
-            'testpass'
-        )
-        self.client = APIClient()
         self.client.force_authenticate(self.user)
 
     def test_retrieve_tags(self):
@@ -53,11 +55,7 @@ class PrivateTagsApiTest(TestCase):
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for the authenticated user"""
-        user2 = get_user_model().objects.create_user(
-            'other@test.com',
-            'otherpass'
-        )
-        Tag.objects.create(user=user2, name='Fruity')
+        Tag.objects.create(user=self.user2, name='Fruity')
         tag = Tag.objects.create(user=self.user, name='Comfort Food')
 
         response = self.client.get(TAGS_URL)
@@ -114,14 +112,13 @@ class PrivateTagsApiTest(TestCase):
             price=4.00,
             user=self.user
         )
-        recipe1.tags.add(tag)
         recipe2 = Recipe.objects.create(
             title='Bread sushi',
             time_minutes=20,
             price=5.00,
             user=self.user
         )
-        recipe2.tags.add(tag)
+        tag.recipe_set.add(recipe1, recipe2)
 
         response = self.client.get(TAGS_URL, {'assigned_only': 1})
 
@@ -71,8 +71,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if ingredients:
             ingredient_ids = self._params_to_int(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        if self.action == 'list':
+            queryset = queryset.prefetch_related('tags', 'ingredients')
 
-        return queryset.filter(user=self.request.user)
+        return queryset.filter(user=self.request.user).order_by('-id')
 
     def get_serializer_class(self):
         """Retrieve a serializer class for a particular request"""
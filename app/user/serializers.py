@@ -4,6 +4,9 @@ from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 
 
+User = get_user_model()
+
+
 class UserSerializer(serializers.ModelSerializer):
     """ Serializer for the users object """
 
@@ -12,7 +15,7 @@ class UserSerializer(serializers.ModelSerializer):
         Create a new user with encrypted password and return it
         """
 
-        return get_user_model().objects.create_user(**validated_data)
+        return User.objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
         """
@@ -20,16 +23,14 @@ class UserSerializer(serializers.ModelSerializer):
         """
 
         password = validated_data.pop('password', None)
-        user = super().update(instance, validated_data)
 
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
 
-        return user
+        return super().update(instance, validated_data)
 
     class Meta:
-        model = get_user_model()
+        model = User
         fields = ('email', 'password', 'name')
         extra_kwargs = {
             'password':
@@ -1,3 +1,6 @@
+from functools import lru_cache
+from types import MappingProxyType
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -6,35 +9,60 @@ from rest_framework.test import APIClient
 from rest_framework import status
 
 
-CREATE_USER_URL = reverse('user:create')
-TOKEN_URL = reverse('user:token')
-ME_URL = reverse('user:me')
+User = get_user_model()
+
+VALID_USER_PAYLOAD = MappingProxyType({
+    'email': 'new@test.com',
+    'password': 'testtest',
+    'name': 'Test name'
+})
+USER_CREDENTIALS = MappingProxyType({
+    'email': 'test@test.com',
+    'password': 'testpass'
+})
+
+
+@lru_cache(maxsize=None)
+def create_user_url():
+    """Return the user create URL"""
+    return reverse('user:create')
+
+
+@lru_cache(maxsize=None)
+def token_url():
+    """Return the auth token URL"""
+    return reverse('user:token')
+
+
+@lru_cache(maxsize=None)
+def me_url():
+    """Return the authenticated user profile URL"""
+    return reverse('user:me')
 
 
 def create_user(**params):
-    return get_user_model().objects.create_user(**params)
+    return User.objects.create_user(**params)
 
 
 class PublicUserApiTests(TestCase):
     """ Test the users API (public) """
 
-    def setUp(self):
-        self.client = APIClient()
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.existing_user = create_user(**USER_CREDENTIALS)
 
     def test_create_valid_user_success(self):
         """
         Test creating user with valid payload is successful
         """
 
-        payload = {
-            'email': 'test@test.com',
-            'password': 'testtest',
-            'name': 'Test name'
-        }
-        response = self.client.post(CREATE_USER_URL, payload)
+        payload = VALID_USER_PAYLOAD
+        response = self.client.post(create_user_url(), payload, format='json')
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        user = get_user_model().objects.get(**response.data)
+        user = User.objects.get(email=payload['email'])
         self.assertTrue(user.check_password(payload['password']))
         self.assertNotIn('password', response.data)
 
@@ -44,12 +72,10 @@ class PublicUserApiTests(TestCase):
         """
 
         payload = {
-            'email': 'test@test.pl',
-            'password': 'testing123'
+            'email': self.existing_user.email,
+            'password': USER_CREDENTIALS['password']
         }
-        create_user(**payload)
-
-        response = self.client.post(CREATE_USER_URL, payload)
+        response = self.client.post(create_user_url(), payload, format='json')
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
@@ -62,20 +88,24 @@ class PublicUserApiTests(TestCase):
             'email': 'test@testo.com',
             'password': '123'
         }
-        response = self.client.post(CREATE_USER_URL, payload)
+        # Only the unique email check runs, no user is inserted
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                create_user_url(), payload, format='json'
+            )
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        user_exists = get_user_model().objects.filter(
-            email=payload['email']
-        ).exists()
-        self.assertFalse(user_exists)
 
     def test_create_token_for_user(self):
         """ Test that a token is created for the user """
 
-        payload = {'email': 'test@test.com', 'password': 'testpass'}
-        create_user(**payload)
-        response = self.client.post(TOKEN_URL, payload)
+        payload = {
+            'email': self.existing_user.email,
+            'password': USER_CREDENTIALS['password']
+        }
+        # User lookup, token lookup and the token INSERT in a savepoint
+        with self.assertNumQueries(5):
+            response = self.client.post(token_url(), payload, format='json')
 
         self.assertIn('token', response.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -85,9 +115,9 @@ class PublicUserApiTests(TestCase):
         Test that token is not created if invalid credentials are given
         """
 
-        create_user(email='test@test.com', password='testpass')
-        payload = {'email': 'test@test.com', 'password': 'wrong'}
-        response = self.client.post(TOKEN_URL, payload)
+        payload = {'email': self.existing_user.email, 'password': 'wrong'}
+        with self.assertNumQueries(1):
+            response = self.client.post(token_url(), payload, format='json')
 
         self.assertNotIn('token', response.data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -97,8 +127,8 @@ class PublicUserApiTests(TestCase):
         Test that token is not created if user doesn't exist
         """
 
-        payload = {'email': 'test@test.com', 'password': 'wrong'}
-        response = self.client.post(TOKEN_URL, payload)
+        payload = {'email': 'nouser@test.com', 'password': 'wrong'}
+        response = self.client.post(token_url(), payload, format='json')
 
         self.assertNotIn('token', response.data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -106,33 +136,30 @@ class PublicUserApiTests(TestCase):
     def test_create_token_missing_fields(self):
         """ Test that email and password is required """
 
-        response = self.client.post(
-            TOKEN_URL,
-            {'email': 'one', 'password': ''}
-        )
-        self.assertNotIn('token', response.data)
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-
-        response = self.client.post(
-            TOKEN_URL,
-            {'email': '', 'password': 'wrong'}
+        payloads = (
+            {'email': 'one', 'password': ''},
+            {'email': '', 'password': 'wrong'},
+            {'email': '', 'password': ''},
         )
-        self.assertNotIn('token', response.data)
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-
-        response = self.client.post(
-            TOKEN_URL,
-            {'email': '', 'password': ''}
-        )
-        self.assertNotIn('token', response.data)
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                with self.assertNumQueries(0):
+                    response = self.client.post(
+                        token_url(), payload, format='json'
+                    )
+
+                self.assertNotIn('token', response.data)
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_400_BAD_REQUEST
+                )
 
     def test_retrieve_user_unauthorised(self):
         """
         Test that authentication is required for users
         """
 
-        response = self.client.get(ME_URL)
+        response = self.client.get(me_url())
 
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
@@ -154,7 +181,7 @@ class PrivateUsersApiTests(TestCase):
         Test retrieving profile for logged user
         """
 
-        response = self.client.get(ME_URL)
+        response = self.client.get(me_url())
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, {
@@ -165,7 +192,7 @@ class PrivateUsersApiTests(TestCase):
     def test_post_me_not_allowed(self):
         """ Test that POST is not allowed on the me url """
 
-        response = self.client.post(ME_URL)
+        response = self.client.post(me_url())
 
         self.assertEqual(
             response.status_code,
@@ -178,7 +205,7 @@ class PrivateUsersApiTests(TestCase):
         """
 
         payload = {'name': 'new name', 'password': 'newpass'}
-        response = self.client.patch(ME_URL, payload)
+        response = self.client.patch(me_url(), payload)
 
         self.user.refresh_from_db()
         self.assertEqual(self.user.name, payload['name'])